@@ -1,9 +1,11 @@
+import asyncio
 from aiogram import types, F, Router
 from aiogram.filters import Command, CommandStart, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
-from config import collection
+from config import get_collection
 from bot.states import ReportState
+from rag.chroma import delete_article as delete_article_from_db
 
 router = Router()
 
@@ -37,7 +39,7 @@ def build_report_keyboard(articles: list[tuple[str,str]]):
 @router.message(Command("report"))
 async def cmd_report(message: types.Message, state: FSMContext):
     # В реальном продукте тут должна быть пагинация, а пока limit=100
-    data = collection.get(limit=100, include=['metadatas'])
+    data = get_collection().get(limit=100, include=['metadatas'])
     metadatas = data.get('metadatas') or []
 
     if not metadatas:
@@ -105,7 +107,7 @@ async def delete_article(callback, state: FSMContext):
 
     # Удаляем из коллекции
     try:
-        collection.delete(where={"url": target_url})
+        await asyncio.to_thread(delete_article_from_db, target_url)
     except Exception as e:
         # логгируем ошибку, но не ломаем UX
         print("Ошибка при удалении из collection:", e)
@@ -42,10 +42,12 @@ async def handle_link(message: types.Message):
     # 2. Генерация саммари через LLM
     try:
         summary = await asyncio.to_thread(generate_summary, text)
-        await asyncio.to_thread(save_article_to_db, url, title, text, summary)
+        skipped = await asyncio.to_thread(save_article_to_db, url, title, text, summary)
+        # Сообщаем, если часть текста уже была в базе (например, перепечатка)
+        dup_note = f"♻️ Повторяющихся фрагментов: {skipped} (взяты из уже сохранённых статей)\n\n" if skipped else ""
 
         await message.answer(
-            f"💾 **Сохранено в базу знаний!**\n\n{summary}\n\n"
+            f"💾 **Сохранено в базу знаний!**\n\n{summary}\n\n{dup_note}"
             f"Теперь можешь задавать вопросы или запустить /quiz!",
             parse_mode="Markdown"
         )
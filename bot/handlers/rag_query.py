@@ -4,7 +4,7 @@ from aiogram import types, F, Router
 from bot import bot
 from rag.chroma import search_in_db
 from rag.llm import expand_query
-from config import CHAT_MODEL
+from config import CHAT_MODEL, KEEP_ALIVE
 
 router = Router()
 
@@ -41,7 +41,7 @@ async def handle_question(message: types.Message):
     Вопрос: {user_text}
     """
 
-    response = ollama.chat(model=CHAT_MODEL, messages=[{'role': 'user', 'content': prompt}],
+    response = ollama.chat(model=CHAT_MODEL, messages=[{'role': 'user', 'content': prompt}], keep_alive=KEEP_ALIVE,
         options={
             'temperature': 0.1,  # Минимум фантазии
             'num_ctx': 8192  # Больше памяти
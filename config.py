@@ -1,6 +1,6 @@
 import os
+import threading
 
-import chromadb
 from dotenv import load_dotenv
 
 # --- КОНФИГУРАЦИЯ ---
@@ -9,7 +9,44 @@ TOKEN = os.getenv("BOT_TOKEN")
 EMBED_MODEL = "nomic-embed-text"
 CHAT_MODEL = "gemma2:9b"
 
-# Инициализируем "Вечную" базу данных
-# Данные будут сохраняться в папку ./rag_db
-chroma_client = chromadb.PersistentClient(path="./rag_db")
-collection = chroma_client.get_or_create_collection(name="articles_knowledge")
\ No newline at end of file
+
+def _parse_keep_alive(value):
+    """Число без единиц (например, -1 или 3600) Ollama принимает только как int, а не строку"""
+    try:
+        return int(value)
+    except ValueError:
+        return value  # длительность вида "30m", "1h"
+
+
+# Сколько Ollama держит модели в памяти после последнего запроса.
+# По умолчанию (5m) модель выгружается, и следующий пользователь ждёт её загрузку заново.
+# Своя переменная, а не OLLAMA_KEEP_ALIVE: та уже настраивает сам сервер Ollama
+KEEP_ALIVE = _parse_keep_alive(os.getenv("BOT_KEEP_ALIVE", "30m"))
+
+# Файл-маркер готовности: появляется после прогрева моделей, удаляется при остановке.
+# Можно использовать как readiness-probe (например, `test -f bot.ready`)
+READY_FILE = os.getenv("READY_FILE", "./bot.ready")
+
+# "Вечная" база данных. Данные будут сохраняться в папку ./rag_db
+CHROMA_PATH = "./rag_db"
+COLLECTION_NAME = "articles_knowledge"
+# Отметка, что старые куски уже добавлены в индекс дубликатов (лежит рядом с базой)
+DEDUP_BACKFILL_MARKER = os.path.join(CHROMA_PATH, ".dedup_backfilled")
+
+_chroma_lock = threading.Lock()
+_chroma_client = None
+_collection = None
+
+
+def get_collection():
+    """Лениво открывает базу ChromaDB и коллекцию (один раз, потокобезопасно)"""
+    global _chroma_client, _collection
+    if _collection is None:
+        with _chroma_lock:
+            # Повторная проверка: пока ждали замок, другой поток мог уже всё открыть
+            if _collection is None:
+                import chromadb  # тяжёлый импорт, не тянем его при старте модуля
+
+                _chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
+                _collection = _chroma_client.get_or_create_collection(name=COLLECTION_NAME)
+    return _collection
@@ -1,7 +1,10 @@
 import asyncio
+import sys
 from aiogram import Dispatcher
 from bot import bot
 from bot.handlers import base, link_parse, rag_query, quiz
+from config import CHROMA_PATH
+from rag.warmup import backfill_once, warm_up_with_retry, clear_ready
 
 
 # --- ЗАПУСК ---
@@ -13,13 +16,28 @@ async def main():
     dp.include_router(quiz.router)
     dp.include_router(rag_query.router)
 
-    print("🚀 Бот запущен (База данных: ./rag_db)")
+    print(f"🚀 Бот запущен (База данных: {CHROMA_PATH})")
     await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+    await dp.start_polling(bot)  # при остановке сам закрывает сессию бота
 
 
 if __name__ == "__main__":
     try:
+        # Всё до приёма сообщений делаем синхронно, до запуска event loop:
+        # так Ctrl-C прерывает ожидание сразу, а сессия бота ещё не открыта и закрывать её не нужно.
+
+        # Старые куски без ключей не видны поиску, поэтому без миграции не стартуем
+        if not backfill_once():
+            print("❌ Не удалось дополнить индекс дубликатов, бот не запущен")
+            sys.exit(1)
+
+        # Прогреваем базу и модели. Без моделей бот всё равно не сможет отвечать,
+        # поэтому падаем, а не работаем "неготовым"
+        if not warm_up_with_retry():
+            print("❌ Не удалось прогреть модели, бот не запущен")
+            sys.exit(1)
         asyncio.run(main())
     except KeyboardInterrupt:
-        print("Бот остановлен")
\ No newline at end of file
+        print("Бот остановлен")
+    finally:
+        clear_ready()
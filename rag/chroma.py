@@ -1,38 +1,106 @@
 import datetime
+import uuid
 import ollama
-from rag.utils import split_text
-from config import EMBED_MODEL, collection
+from rag.dedup import minhash, lsh_keys, lsh_where, find_duplicate, dedup_results, record_skip, record_reuse, get_stats
+from rag.utils import iter_chunks
+from config import EMBED_MODEL, KEEP_ALIVE, get_collection
+
+# В векторный поиск попадают только оригиналы, ссылки на дубликаты отсекаются
+ORIGINALS_ONLY = {"is_duplicate": False}
 
 
 def save_article_to_db(url, title, text, summary_block):
-    """Сохраняет статью и её векторы в базу"""
-    # 1. Режем текст
-    chunks = split_text(text)
-
-    print(f"Сохраняю {len(chunks)} фрагментов для: {title}")
-
-    # 2. Сохраняем каждый кусок отдельно
-    for i, chunk in enumerate(chunks):
-        # Генерируем вектор для КУСКА, а не всего текста
-        emb_response = ollama.embeddings(model=EMBED_MODEL, prompt=chunk)
-
-        collection.upsert(
-            ids=[f"{url}_{i}"],  # Уникальный ID для куска
-            documents=[chunk],
-            embeddings=[emb_response["embedding"]],
-            metadatas=[{
+    """Сохраняет статью и её векторы в базу. Возвращает число пропущенных дубликатов"""
+    collection = get_collection()
+    # Прежняя версия этой же статьи (при повторном сохранении ссылки).
+    # Её удаляем только после того, как новая записана целиком, — сбой Ollama посередине ничего не теряет
+    old_ids = set(collection.get(where={"url": url}, include=[])['ids'])
+    version = uuid.uuid4().hex[:8]  # новые куски пишем под свежими id, не пересекаясь со старыми
+    print(f"Сохраняю фрагменты для: {title}")
+
+    # Режем текст лениво: эмбеддинг первого куска начинается,
+    # пока остальной текст ещё не нарезан. Сохраняем каждый кусок отдельно
+    new_ids = []
+    replaced = {}  # id старого куска -> id нового куска с тем же текстом
+    saved = 0
+    skipped = 0
+    try:
+        for i, chunk in enumerate(iter_chunks(text)):
+            chunk_id = f"{url}_{version}_{i}"  # Уникальный ID для куска
+            metadata = {
                 "title": title,
                 "url": url,
                 "summary": summary_block,  # Саммари у всех кусков одинаковое
                 "chunk_id": i,
                 "date_added": datetime.datetime.now().strftime("%Y-%m-%d")
-            }]
-        )
+            }
+
+            # Ищем почти такой же кусок через LSH-ключи в метаданных (они есть только у оригиналов).
+            # На куски прежней версии статьи не ссылаемся — они скоро будут удалены
+            signature = minhash(chunk)
+            keys = lsh_keys(signature)
+            candidates = collection.get(where=lsh_where(keys), include=['documents', 'embeddings'])
+            others = [(cid, "" if cid in old_ids else doc) for cid, doc in zip(candidates['ids'], candidates['documents'])]
+            index, score = find_duplicate(signature, others)
+
+            if index is not None:
+                # Дубликат: не векторизуем заново, а ссылаемся на оригинал (текст не храним).
+                # Вектор копируем, чтобы ссылка могла стать оригиналом, если тот удалят
+                collection.add(
+                    ids=[chunk_id],
+                    documents=[""],
+                    embeddings=[_as_list(candidates['embeddings'][index])],
+                    metadatas=[{**metadata, "is_duplicate": True, "duplicate_of": candidates['ids'][index]}]
+                )
+                new_ids.append(chunk_id)
+                record_skip(chunk)
+                skipped += 1
+                continue
+
+            # Кусок не изменился с прежней версии статьи — берём её вектор вместо нового эмбеддинга
+            previous = [(cid, doc if cid in old_ids else "") for cid, doc in zip(candidates['ids'], candidates['documents'])]
+            index, score = find_duplicate(signature, previous)
+            if index is not None:
+                embedding = _as_list(candidates['embeddings'][index])
+                replaced[candidates['ids'][index]] = chunk_id
+                record_reuse()
+            else:
+                # Генерируем вектор для КУСКА, а не всего текста
+                embedding = ollama.embeddings(model=EMBED_MODEL, prompt=chunk, keep_alive=KEEP_ALIVE)["embedding"]
+
+            collection.add(
+                ids=[chunk_id],
+                documents=[chunk],
+                embeddings=[embedding],
+                metadatas=[{**metadata, **keys, "is_duplicate": False}]
+            )
+            new_ids.append(chunk_id)
+            saved += 1
+    except Exception:
+        # Убираем недописанную новую версию, старая остаётся нетронутой
+        if new_ids:
+            collection.delete(ids=new_ids)
+        raise
+
+    # Новая версия записана — удаляем старую. Ссылки на её куски переводим на новые куски с тем же текстом
+    _delete_chunks(list(old_ids), replaced)
+
+    stats = get_stats()
+    print(f"Сохранено {saved} фрагментов, пропущено дубликатов: {skipped} для: {title}")
+    print(f"Дедупликация с момента запуска: сэкономлено {stats['saved_embedding_calls']} вызовов эмбеддинга, "
+          f"{stats['saved_text_bytes'] / 1024:.1f} КБ текста не сохранено повторно "
+          f"(вектор и метаданные у ссылок всё равно хранятся)")
+    return skipped
+
+
+def _as_list(embedding):
+    """ChromaDB может вернуть вектор как numpy-массив — приводим к обычному списку"""
+    return [float(x) for x in embedding]
 
 
 def get_unique_articles():
     """Возвращает список уникальных статей (title, url)"""
-    data = collection.get(limit=100, include=['metadatas'])
+    data = get_collection().get(limit=100, include=['metadatas'])
     unique = {}
     if data['metadatas']:
         for meta in data['metadatas']:
@@ -45,20 +113,25 @@ def get_unique_articles():
 def search_in_db(query):
     """Ищет ответ в базе данных"""
     # Векторизуем вопрос
-    query_emb = ollama.embeddings(model=EMBED_MODEL, prompt=query)["embedding"]
+    query_emb = ollama.embeddings(model=EMBED_MODEL, prompt=query, keep_alive=KEEP_ALIVE)["embedding"]
 
-    # Берем ТОП-5 результатов
-    results = collection.query(
+    # Берем с запасом, чтобы после удаления похожих кусков осталось ТОП-5.
+    # Ссылки на дубликаты в поиск не попадают вовсе
+    results = get_collection().query(
         query_embeddings=[query_emb],
-        n_results=5
+        n_results=10,
+        where=ORIGINALS_ONLY
     )
 
     if not results['documents'] or not results['documents'][0]:
         return None, None
 
-    # Собираем тексты всех 5-х найденных кусков в одну строку
-    found_texts = results['documents'][0] # Это список ['текст1', 'текст2', 'текст3']
-    metadatas = results['metadatas'][0]
+    # Убираем куски, сильно пересекающиеся с уже отобранными (перепечатки, которые
+    # при сохранении не склеились в ссылки), и собираем тексты ТОП-5 в одну строку
+    documents = results['documents'][0]
+    kept = dedup_results(documents, limit=5)
+    found_texts = [documents[i] for i in kept]  # Это список ['текст1', 'текст2', 'текст3']
+    metadatas = [results['metadatas'][0][i] for i in kept]
 
     # Возвращаем склеенный текст и метаданные первого (самого релевантного) источника
     combined_text = "\n---\n".join(found_texts)
@@ -68,12 +141,113 @@ def search_in_db(query):
 def get_full_text_by_url(target_url):
     """Собирает полный текст статьи из всех её чанков"""
     # Ищем все записи с этим URL
-    data = collection.get(where={"url": target_url})
+    data = get_collection().get(where={"url": target_url})
     if not data['documents']:
         return ""
 
+    # Для кусков-дубликатов подтягиваем текст оригинала
+    linked_ids = [meta['duplicate_of'] for meta in data['metadatas'] if meta.get('duplicate_of')]
+    originals = {}
+    if linked_ids:
+        linked = get_collection().get(ids=linked_ids, include=['documents'])
+        originals = dict(zip(linked['ids'], linked['documents']))
+    documents = [originals.get(meta.get('duplicate_of'), doc) for meta, doc in zip(data['metadatas'], data['documents'])]
+
     # Сортируем документы по chunk_id
-    sorted_docs = [doc for _, doc in sorted(zip(data['metadatas'], data['documents']), key=lambda pair: pair[0].get('chunk_id', 0))]
+    sorted_docs = [doc for _, doc in sorted(zip(data['metadatas'], documents), key=lambda pair: pair[0].get('chunk_id', 0))]
 
     full_text = "\n".join(sorted_docs)
-    return full_text
\ No newline at end of file
+    return full_text
+
+
+def delete_article(target_url):
+    """Удаляет статью из базы. Дубликаты из других статей, ссылавшиеся на её куски, получают их текст"""
+    data = get_collection().get(where={"url": target_url}, include=[])
+    _delete_chunks(data['ids'])
+
+
+def _delete_chunks(chunk_ids, replaced=None):
+    """
+    Удаляет куски по id. Ссылки из остающихся кусков на удаляемые оригиналы
+    перенаправляются на замену (replaced: старый id -> новый), а если её нет —
+    первая такая ссылка становится оригиналом с их текстом
+    """
+    if not chunk_ids:
+        return
+    collection = get_collection()
+    replaced = dict(replaced or {})
+    deleted = set(chunk_ids)
+    data = collection.get(ids=chunk_ids, include=['documents', 'metadatas'])
+    originals = {
+        chunk_id: (doc, meta)
+        for chunk_id, doc, meta in zip(data['ids'], data['documents'], data['metadatas'])
+        if not meta.get('is_duplicate')
+    }
+
+    if originals:
+        links = collection.get(where={"duplicate_of": {"$in": list(originals)}}, include=['embeddings', 'metadatas'])
+        for link_id, embedding, meta in zip(links['ids'], links['embeddings'], links['metadatas']):
+            if link_id in deleted:
+                continue  # удалится вместе с остальными
+            original_id = meta['duplicate_of']
+            if original_id in replaced:
+                # У оригинала уже есть замена — просто перенаправляем ссылку
+                collection.update(ids=[link_id], metadatas=[{"duplicate_of": replaced[original_id]}])
+                continue
+
+            # Первый дубликат становится новым оригиналом (с текстом и LSH-ключами).
+            # update/upsert сливают метаданные, поэтому запись пересоздаём, чтобы не осталось duplicate_of
+            original_doc, original_meta = originals[original_id]
+            new_meta = {k: v for k, v in meta.items() if k != 'duplicate_of'}
+            new_meta.update({k: v for k, v in original_meta.items() if k.startswith("lsh_")})
+            new_meta['is_duplicate'] = False
+            collection.delete(ids=[link_id])
+            collection.add(ids=[link_id], documents=[original_doc], embeddings=[_as_list(embedding)], metadatas=[new_meta])
+            replaced[original_id] = link_id
+
+    collection.delete(ids=chunk_ids)
+
+
+def backfill_dedup_index(batch_size=500):
+    """
+    Дополняет индекс дубликатов кусками, сохранёнными до его появления: добавляет им LSH-ключи
+    и метку is_duplicate, а найденные среди них дубликаты превращает в ссылки.
+    Повторный запуск ничего не делает. Возвращает число обработанных кусков
+    """
+    collection = get_collection()
+
+    # Сначала собираем id старых кусков (без метки), потом уже меняем записи
+    pending = []
+    offset = 0
+    while True:
+        page = collection.get(include=['metadatas'], limit=batch_size, offset=offset)
+        if not page['ids']:
+            break
+        pending += [chunk_id for chunk_id, meta in zip(page['ids'], page['metadatas']) if 'is_duplicate' not in meta]
+        offset += batch_size
+
+    if not pending:
+        return 0
+
+    linked = 0
+    for start in range(0, len(pending), batch_size):
+        batch = collection.get(ids=pending[start:start + batch_size], include=['documents', 'embeddings', 'metadatas'])
+        for chunk_id, doc, embedding, meta in zip(batch['ids'], batch['documents'], batch['embeddings'], batch['metadatas']):
+            signature = minhash(doc)
+            keys = lsh_keys(signature)
+            candidates = collection.get(where=lsh_where(keys), include=['documents'])
+            index, score = find_duplicate(signature, zip(candidates['ids'], candidates['documents']))
+
+            if index is None:
+                # Оригинал: достаточно добавить ключи (update дописывает метаданные)
+                collection.update(ids=[chunk_id], metadatas=[{**keys, "is_duplicate": False}])
+                continue
+
+            # Дубликат уже проиндексированного куска: пересоздаём запись как ссылку
+            link_meta = {**meta, "is_duplicate": True, "duplicate_of": candidates['ids'][index]}
+            collection.delete(ids=[chunk_id])
+            collection.add(ids=[chunk_id], documents=[""], embeddings=[_as_list(embedding)], metadatas=[link_meta])
+            linked += 1
+
+    print(f"Индекс дубликатов дополнен: {len(pending)} старых фрагментов, из них дубликатов: {linked}")
+    return len(pending)
@@ -0,0 +1,115 @@
+import hashlib
+import random
+import re
+import threading
+
+# MinHash: 128 хеш-функций, LSH: 16 полос по 8 строк.
+# Порог срабатывания LSH ~ (1/16)^(1/8) ≈ 0.7, кандидаты затем проверяются по оценке Жаккара (DUPLICATE_THRESHOLD)
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3  # шинглы из 3 слов
+DUPLICATE_THRESHOLD = 0.9  # с какого сходства чанки считаем почти одинаковыми
+# В выдаче поиска порог ниже: перепечатка с другим вступлением режется на чанки со сдвигом,
+# и её куски пересекаются с оригиналом на ~0.4-0.6, не будучи дубликатами в смысле DUPLICATE_THRESHOLD.
+# У несвязанных кусков (даже из одной статьи) сходство по шинглам обычно не выше ~0.2
+RESULT_SIMILARITY_THRESHOLD = 0.35
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD_RE = re.compile(r"\w+")
+
+# Фиксированный seed: подписи должны совпадать между перезапусками бота
+_rng = random.Random(42)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+# Статистика за время работы процесса
+_stats_lock = threading.Lock()
+_stats = {"skipped_chunks": 0, "saved_embedding_calls": 0, "saved_text_bytes": 0}
+
+
+def _shingles(text):
+    """Множество хешей шинглов (по SHINGLE_SIZE слов подряд, без учёта регистра)"""
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        words = words + [""] * (SHINGLE_SIZE - len(words))
+    return {
+        int.from_bytes(hashlib.blake2b(" ".join(words[i:i + SHINGLE_SIZE]).encode(), digest_size=4).digest(), "little")
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash(text):
+    """MinHash-подпись текста: список из NUM_PERM чисел"""
+    shingles = _shingles(text)
+    return [min((a * s + b) % _PRIME & _MAX_HASH for s in shingles) for a, b in _PERMUTATIONS]
+
+
+def similarity(sig_a, sig_b):
+    """Оценка сходства Жаккара по двум подписям"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def lsh_keys(signature):
+    """Ключи LSH-полос в виде метаданных: {"lsh_0": "...", ...}"""
+    keys = {}
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(repr(rows).encode(), digest_size=8).hexdigest()
+        keys[f"lsh_{band}"] = digest
+    return keys
+
+
+def lsh_where(keys):
+    """Фильтр ChromaDB: чанки, у которых совпадает хотя бы одна полоса"""
+    return {"$or": [{name: value} for name, value in keys.items()]}
+
+
+def find_duplicate(signature, candidates):
+    """
+    Ищет среди кандидатов (ids, documents) самый похожий чанк.
+    Возвращает (индекс, сходство) или (None, 0.0), если сходство ниже порога.
+    """
+    best_index, best_score = None, 0.0
+    for i, (chunk_id, document) in enumerate(candidates):
+        if not document:
+            continue
+        score = similarity(signature, minhash(document))
+        if score >= DUPLICATE_THRESHOLD and score > best_score:
+            best_index, best_score = i, score
+    return best_index, best_score
+
+
+def dedup_results(texts, limit):
+    """Индексы до limit текстов, из которых выкинуты похожие на уже оставленные (порядок сохраняется)"""
+    kept, kept_signatures = [], []
+    for i, text in enumerate(texts):
+        signature = minhash(text)
+        if any(similarity(signature, other) > RESULT_SIMILARITY_THRESHOLD for other in kept_signatures):
+            continue
+        kept.append(i)
+        kept_signatures.append(signature)
+        if len(kept) == limit:
+            break
+    return kept
+
+
+def record_skip(chunk):
+    """Учитывает пропущенный дубликат в статистике"""
+    with _stats_lock:
+        _stats["skipped_chunks"] += 1
+        _stats["saved_embedding_calls"] += 1
+        # Ссылка всё равно хранит вектор и метаданные — экономится только сам текст
+        _stats["saved_text_bytes"] += len(chunk.encode())
+
+
+def record_reuse():
+    """Учитывает вектор, взятый у прежней версии той же статьи вместо нового эмбеддинга"""
+    with _stats_lock:
+        _stats["saved_embedding_calls"] += 1
+
+
+def get_stats():
+    """Сколько дубликатов пропущено с момента запуска"""
+    with _stats_lock:
+        return dict(_stats)
@@ -1,6 +1,6 @@
 import json
 import ollama
-from config import CHAT_MODEL
+from config import CHAT_MODEL, KEEP_ALIVE
 
 
 def generate_summary(text):
@@ -24,7 +24,7 @@ def generate_summary(text):
     """
     # Ограничиваем текст 4000 символов, чтобы не забить контекст
 
-    response = ollama.chat(model=CHAT_MODEL, messages=[{'role': 'user', 'content': prompt}],
+    response = ollama.chat(model=CHAT_MODEL, messages=[{'role': 'user', 'content': prompt}], keep_alive=KEEP_ALIVE,
         options={
             'temperature': 0.3,  # Небольшая свобода для красивого слога
             'num_ctx': 8192  # Чтобы влезла вся статья целиком
@@ -59,7 +59,7 @@ def generate_quiz_json(text, num_questions):
         {safe_text} 
         """
 
-    response = ollama.chat(model=CHAT_MODEL, messages=[{'role': 'user', 'content': prompt}],
+    response = ollama.chat(model=CHAT_MODEL, messages=[{'role': 'user', 'content': prompt}], keep_alive=KEEP_ALIVE,
         options={
             'temperature': 0.6,  # Немного креатива, чтобы вопросы не повторялись
             'num_ctx': 8192 # Больше памяти
@@ -90,7 +90,7 @@ def expand_query(user_query):
     Верни ТОЛЬКО переформулированный запрос. Никаких вступлений.
     """
 
-    response = ollama.chat(model=CHAT_MODEL, messages=[{'role': 'user', 'content': prompt}],
+    response = ollama.chat(model=CHAT_MODEL, messages=[{'role': 'user', 'content': prompt}], keep_alive=KEEP_ALIVE,
         options={
             'temperature': 0.0,  # Максимальная точность и детерминизм
             'num_ctx': 2048 # Стандартное значение, тут много не надо
@@ -1,10 +1,149 @@
-def split_text(text, chunk_size=1000, overlap=100):
-    """Режет текст на куски по chunk_size символов с перекрытием"""
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        # overlap нужен, чтобы не разрезать важную мысль посередине
-        start += (chunk_size - overlap)
-    return chunks
\ No newline at end of file
+import io
+import re
+
+# Примерная оценка токенов для модели эмбеддингов:
+# каждое слово/знак препинания — минимум 1 токен, длинные слова ~1 токен на 4 символа
+CHARS_PER_TOKEN = 4
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+# Граница предложения: знак конца предложения и пробел после него
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+")
+_CODE_FENCE = "```"
+
+
+def count_tokens(text):
+    """Приблизительно считает количество токенов в тексте (без токенизатора)"""
+    return sum(-(-len(piece) // CHARS_PER_TOKEN) for piece in _TOKEN_RE.findall(text))
+
+
+def iter_chunks(text, max_tokens=256, overlap_tokens=32):
+    """
+    Лениво режет текст на чанки размером до max_tokens (примерных) токенов.
+    Старается не разрывать абзацы, предложения и блоки кода;
+    соседние чанки перекрываются хвостом до overlap_tokens токенов.
+    """
+    window = []  # [(текст, токены, разделитель перед ним)]
+    size = 0
+
+    for unit in _iter_units(text, max_tokens):
+        tokens = unit[1]
+        if window and size + tokens > max_tokens:
+            yield _join(window)
+            # overlap нужен, чтобы не разрезать важную мысль посередине
+            window, size = _tail(window, overlap_tokens)
+            while window and size + tokens > max_tokens:
+                size -= window.pop(0)[1]
+        window.append(unit)
+        size += tokens
+
+    if window:
+        yield _join(window)
+
+
+def _join(window):
+    """Склеивает кусочки чанка обратно, сохраняя исходные разделители"""
+    parts = [window[0][0]]
+    for piece, _, sep in window[1:]:
+        parts.append(sep)
+        parts.append(piece)
+    return "".join(parts)
+
+
+def _tail(window, overlap_tokens):
+    """Последние кусочки чанка, которые переносятся в следующий как перекрытие"""
+    tail = []
+    size = 0
+    for unit in reversed(window):
+        if size + unit[1] > overlap_tokens:
+            break
+        tail.insert(0, unit)
+        size += unit[1]
+    return tail, size
+
+
+def _iter_units(text, max_tokens):
+    """Выдаёт неделимые кусочки текста: абзацы, а если они велики — строки, предложения, слова"""
+    for block, is_code in _iter_blocks(text):
+        tokens = count_tokens(block)
+        if tokens == 0:
+            continue
+        if tokens <= max_tokens:
+            yield block, tokens, "\n\n"
+            continue
+
+        # Большой блок режем сначала по строкам: trafilatura разделяет абзацы одним \n
+        sep = "\n\n"
+        for line in block.split("\n"):
+            line_tokens = count_tokens(line)
+            if line_tokens == 0:
+                continue
+            if line_tokens <= max_tokens:
+                yield line, line_tokens, sep
+            else:
+                # Длинную строку кода режем по символам (отступы и пробелы важны), текст — по предложениям
+                pieces = _iter_slices(line, max_tokens) if is_code else _iter_sentences(line, max_tokens)
+                for piece, piece_sep in pieces:
+                    yield piece, count_tokens(piece), sep
+                    sep = piece_sep
+            sep = "\n"
+
+
+def _iter_sentences(text, max_tokens):
+    """Режет строку на (предложение, разделитель); длинные предложения — по словам"""
+    for sentence in _SENTENCE_RE.split(text):
+        if count_tokens(sentence) <= max_tokens:
+            yield sentence, " "
+            continue
+        # Слишком длинное предложение (например, субтитры без знаков препинания)
+        for word in sentence.split():
+            if count_tokens(word) <= max_tokens:
+                yield word, " "
+            else:
+                # Сверхдлинное "слово" (base64, ссылка): куски склеиваются без пробела
+                slices = list(_iter_slices(word, max_tokens))
+                for i, (piece, _) in enumerate(slices):
+                    yield piece, " " if i == len(slices) - 1 else ""
+
+
+def _iter_slices(text, max_tokens):
+    """Режет строку по символам без потери пробелов; куски склеиваются обратно без разделителя"""
+    # Один символ — не больше одного токена, так что max_tokens символов всегда влезают
+    for start in range(0, len(text), max_tokens):
+        yield text[start:start + max_tokens], ""
+
+
+def _iter_blocks(text):
+    """
+    Построчно проходит текст и выдаёт (блок, это_код): абзацы и ```блоки кода```.
+    Код распознаётся только по ```-ограждениям (markdown); обычный вывод trafilatura их не содержит.
+    """
+    paragraph = []
+    code = None  # строки текущего блока кода, если мы внутри него
+
+    for line in io.StringIO(text):
+        line = line.rstrip("\r\n")
+
+        if code is not None:
+            code.append(line)
+            if line.strip().startswith(_CODE_FENCE):
+                yield "\n".join(code), True
+                code = None
+            continue
+
+        # Ограждение, открытое и закрытое в одной строке (```pip install x```), — обычный текст
+        stripped = line.strip()
+        if stripped.startswith(_CODE_FENCE) and stripped.count(_CODE_FENCE) == 1:
+            if paragraph:
+                yield "\n".join(paragraph), False
+                paragraph = []
+            code = [line]
+        elif stripped:
+            paragraph.append(line)
+        elif paragraph:
+            yield "\n".join(paragraph), False
+            paragraph = []
+
+    # Незакрытый блок кода или последний абзац
+    if code is not None:
+        yield "\n".join(code), True
+    if paragraph:
+        yield "\n".join(paragraph), False
@@ -0,0 +1,96 @@
+import os
+import time
+import ollama
+from config import CHAT_MODEL, EMBED_MODEL, KEEP_ALIVE, READY_FILE, DEDUP_BACKFILL_MARKER, get_collection
+from rag.chroma import backfill_dedup_index
+
+# Повторы прогрева: Ollama может подняться на несколько секунд позже бота
+WARMUP_ATTEMPTS = int(os.getenv("WARMUP_ATTEMPTS", "8"))
+WARMUP_MAX_DELAY = 60  # секунд между попытками, не больше
+
+
+def warm_up():
+    """
+    Открывает базу и заранее загружает модели в Ollama, чтобы первый
+    пользователь после рестарта не ждал их загрузку.
+    Возвращает True, если всё прогрелось.
+    """
+    clear_ready()
+    start = time.perf_counter()
+
+    try:
+        get_collection()
+        db_time = time.perf_counter()
+
+        # Короткий запрос на эмбеддинг подгружает модель векторизации
+        ollama.embeddings(model=EMBED_MODEL, prompt="warm-up", keep_alive=KEEP_ALIVE)
+        embed_time = time.perf_counter()
+
+        # Пустой промпт только загружает модель в память, ничего не генерируя
+        ollama.generate(model=CHAT_MODEL, prompt="", keep_alive=KEEP_ALIVE)
+        chat_time = time.perf_counter()
+    except Exception as e:
+        print(f"⚠️ Прогрев не удался за {time.perf_counter() - start:.1f} с: {e}")
+        return False
+
+    print(
+        f"🔥 Прогрев завершён за {chat_time - start:.1f} с "
+        f"(ChromaDB: {db_time - start:.1f} с, {EMBED_MODEL}: {embed_time - db_time:.1f} с, "
+        f"{CHAT_MODEL}: {chat_time - embed_time:.1f} с, keep_alive={KEEP_ALIVE})"
+    )
+    mark_ready()
+    return True
+
+
+def warm_up_with_retry(attempts=WARMUP_ATTEMPTS):
+    """Повторяет прогрев с нарастающей паузой (1, 2, 4... с). Возвращает True при успехе"""
+    delay = 1
+    for attempt in range(1, attempts + 1):
+        if warm_up():
+            return True
+        if attempt < attempts:
+            print(f"Повтор прогрева через {delay} с (попытка {attempt + 1} из {attempts})")
+            time.sleep(delay)
+            delay = min(delay * 2, WARMUP_MAX_DELAY)
+    return False
+
+
+def backfill_once():
+    """
+    Одноразовая миграция: добавляет в индекс дубликатов куски, сохранённые до его появления.
+    После успеха оставляет отметку рядом с базой, и при следующих запусках ничего не делает.
+    Возвращает False, если миграция упала
+    """
+    if os.path.exists(DEDUP_BACKFILL_MARKER):
+        return True
+
+    start = time.perf_counter()
+    try:
+        count = backfill_dedup_index()
+        with open(DEDUP_BACKFILL_MARKER, "w") as f:
+            f.write(str(int(time.time())))
+    except Exception as e:
+        print(f"⚠️ Не удалось дополнить индекс дубликатов: {e}")
+        return False
+
+    print(f"🧩 Индекс дубликатов дополнен за {time.perf_counter() - start:.1f} с (старых фрагментов: {count})")
+    return True
+
+
+def mark_ready():
+    """Создаёт файл-маркер готовности для внешних проверок"""
+    try:
+        with open(READY_FILE, "w") as f:
+            f.write(str(int(time.time())))
+    except OSError as e:
+        print("Не удалось записать файл готовности:", e)
+
+
+def clear_ready():
+    """Удаляет файл-маркер готовности (при старте и при остановке бота)"""
+    try:
+        os.remove(READY_FILE)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print("Не удалось удалить файл готовности:", e)